@@ -0,0 +1,101 @@
+import numpy as np
+
+# Aumento de datos offline para el banco de plantillas.
+# Trabaja sobre lotes (N, H, W) de glifos en gris invertido (glifo claro,
+# fondo oscuro) del mismo tamaño: cada transformación se aplica a todo el
+# lote con operaciones de NumPy, sin bucles por muestra. La binarización
+# va al final y es Otsu por muestra, como en step5. Otsu no se entera de
+# cambios lineales de brillo/contraste (desplaza el umbral con ellos), por
+# eso el contraste es una curva gamma: sí mueve el borde del trazo.
+
+GIRO_MAX = 6.0          # grados (+/-)
+PROB_DESENFOQUE = 0.5   # fracción del lote que se desenfoca
+CONTRASTE = (0.6, 1.6)  # exponente gamma (< 1 engorda el trazo, > 1 lo adelgaza)
+
+
+def girar_lote(lote, angulos):
+    """
+    Rota cada imagen del lote su ángulo (grados) alrededor del centro.
+    Vecino más próximo; lo que cae fuera de la imagen queda a 0 (fondo).
+    """
+    n, h, w = lote.shape
+    cy, cx = (h - 1) / 2.0, (w - 1) / 2.0
+    ys, xs = np.mgrid[0:h, 0:w].astype(np.float32)
+    ys, xs = ys - cy, xs - cx
+
+    # Transformación inversa: para cada píxel destino, de dónde viene
+    rad = np.deg2rad(angulos).astype(np.float32)[:, None, None]
+    cos, sin = np.cos(rad), np.sin(rad)
+    src_x = np.rint(cos * xs + sin * ys + cx).astype(np.int32)
+    src_y = np.rint(-sin * xs + cos * ys + cy).astype(np.int32)
+
+    dentro = (src_x >= 0) & (src_x < w) & (src_y >= 0) & (src_y < h)
+    src_x = np.clip(src_x, 0, w - 1)
+    src_y = np.clip(src_y, 0, h - 1)
+    idx = np.arange(n)[:, None, None]
+
+    girado = lote[idx, src_y, src_x]
+    girado[~dentro] = 0
+    return girado
+
+
+def desenfocar_lote(lote):
+    """Media 3x3 (caja) de todo el lote a la vez."""
+    pad = np.pad(lote.astype(np.uint16), ((0, 0), (1, 1), (1, 1)), mode="edge")
+    h, w = lote.shape[1:]
+    suma = np.zeros(lote.shape, np.uint16)
+    for dy in range(3):
+        for dx in range(3):
+            suma += pad[:, dy:dy + h, dx:dx + w]
+    return (suma // 9).astype(np.uint8)
+
+
+def contraste_lote(lote, gammas):
+    """Curva gamma por imagen: 255 * (x / 255) ** gamma."""
+    out = 255.0 * (lote.astype(np.float32) / 255.0) ** gammas[:, None, None]
+    return np.clip(np.rint(out), 0, 255).astype(np.uint8)
+
+
+def binarizar_otsu_lote(lote):
+    """
+    Otsu de cada imagen del lote (mismo resultado que cv2.THRESH_OTSU):
+    > umbral -> 255. Todos los histogramas se calculan de una vez.
+    """
+    n = len(lote)
+    planos = lote.reshape(n, -1).astype(np.int64)
+    hist = np.bincount((planos + 256 * np.arange(n)[:, None]).ravel(),
+                       minlength=256 * n).reshape(n, 256).astype(np.float64)
+
+    niveles = np.arange(256, dtype=np.float64)
+    w0 = np.cumsum(hist, axis=1)            # píxeles <= t
+    w1 = w0[:, -1:] - w0                    # píxeles > t
+    s0 = np.cumsum(hist * niveles, axis=1)
+    s1 = s0[:, -1:] - s0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        entre_clases = w0 * w1 * (s0 / w0 - s1 / w1) ** 2
+    umbral = np.argmax(np.nan_to_num(entre_clases), axis=1)
+
+    return np.where(lote > umbral[:, None, None], 255, 0).astype(np.uint8)
+
+
+def aumentar(muestras, copias, rng):
+    """
+    Genera `copias` variantes de cada captura en gris (giro + desenfoque +
+    contraste) y las devuelve binarizadas con Otsu, igual que las ROIs de step5.
+    """
+    if not muestras or copias <= 0:
+        return []
+
+    lote = np.repeat(np.stack(muestras), copias, axis=0)
+    n = len(lote)
+
+    lote = girar_lote(lote, rng.uniform(-GIRO_MAX, GIRO_MAX, n))
+
+    borrosas = rng.random(n) < PROB_DESENFOQUE
+    if borrosas.any():
+        lote[borrosas] = desenfocar_lote(lote[borrosas])
+
+    lote = contraste_lote(lote, rng.uniform(*CONTRASTE, n).astype(np.float32))
+
+    # Al binarizar, desenfoque + gamma engordan o adelgazan el trazo
+    return list(binarizar_otsu_lote(lote))
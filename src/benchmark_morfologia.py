@@ -0,0 +1,66 @@
+import time
+
+import cv2
+import numpy as np
+
+from morfologia_paralela import segmentar_por_bandas
+from step5_reconocer_carta import segmentar_tapete_verde
+
+# Escalado de la segmentación por bandas frente a la versión de un solo
+# hilo, a varias resoluciones. Los frames son sintéticos (tapete verde
+# con ruido y cartas blancas) y se comprueba que las máscaras coinciden.
+
+RESOLUCIONES = [(1280, 720), (1920, 1080), (3840, 2160)]
+HILOS = [1, 2, 4, 8]
+REPETICIONES = 20
+SEMILLA = 0
+
+
+def frame_sintetico(ancho, alto, rng):
+    frame = np.zeros((alto, ancho, 3), np.uint8)
+    frame[:] = (40, 140, 40)  # verde en BGR
+    ruido = rng.integers(-25, 26, frame.shape, dtype=np.int16)
+    frame = np.clip(frame.astype(np.int16) + ruido, 0, 255).astype(np.uint8)
+
+    for _ in range(6):
+        cw, ch = ancho // 10, alto // 5
+        x = int(rng.integers(0, ancho - cw))
+        y = int(rng.integers(0, alto - ch))
+        cv2.rectangle(frame, (x, y), (x + cw, y + ch), (235, 235, 235), -1)
+
+    # Puntos sueltos para que OPEN/CLOSE tengan trabajo
+    puntos = rng.random((alto, ancho)) < 0.002
+    frame[puntos] = 255
+    return frame
+
+
+def medir(funcion, frame):
+    funcion(frame)  # calentamiento
+    t0 = time.perf_counter()
+    for _ in range(REPETICIONES):
+        funcion(frame)
+    return 1000.0 * (time.perf_counter() - t0) / REPETICIONES
+
+
+def main():
+    rng = np.random.default_rng(SEMILLA)
+    # La comparación es con el propio multihilo interno de OpenCV activo
+    print("Hilos internos de OpenCV:", cv2.getNumThreads())
+
+    for ancho, alto in RESOLUCIONES:
+        # Mismo recorte que en el pipeline: sin el 20% de arriba y abajo
+        frame = frame_sintetico(ancho, alto, rng)[int(alto * 0.20):int(alto * 0.80)]
+        referencia = segmentar_tapete_verde(frame)
+        t_base = medir(segmentar_tapete_verde, frame)
+        print(f"\n{ancho}x{alto}  base: {t_base:7.2f} ms")
+
+        for n in HILOS:
+            funcion = lambda f, n=n: segmentar_por_bandas(f, segmentar_tapete_verde, n)
+            identica = np.array_equal(funcion(frame), referencia)
+            t = medir(funcion, frame)
+            print(f"  {n} hilos: {t:7.2f} ms   x{t_base / t:4.2f}   "
+                  f"{'idéntica' if identica else '⚠ DISTINTA'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+import time
+
+import cv2
+import numpy as np
+
+from calibrar_umbrales import recoger_rois
+from glifos import ajustar_plantilla
+from step5_reconocer_carta import (PLANTILLAS_VALOR_DIR, PLANTILLAS_PALO_DIR,
+                                   MUESTRAS_VALOR_DIR, MUESTRAS_PALO_DIR, LOCALIZAR_GLIFOS,
+                                   cargar_plantillas, cargar_muestras, crear_reconocedor)
+
+# Compara velocidad y acierto de los motores "template" y "descriptores"
+# sobre exactamente las mismas ROIs. Dos fuentes de ROIs:
+#   - una grabación o vídeo etiquetado (RUTA_FUENTE + RUTA_ETIQUETAS, como
+#     en calibrar_umbrales.py): las ROIs reales de extraer_valor_y_palo
+#   - si no se configura, ROIs sintéticas generadas a partir de las
+#     plantillas con desplazamiento, escala, giro, desenfoque y ruido y,
+#     con LOCALIZAR_GLIFOS, ajustadas al glifo como hace step5
+# Las sintéticas solo cubren las deformaciones que simula perturbar: para
+# decidir el motor, mejor usar una grabación.
+
+RUTA_FUENTE = None       # vídeo o directorio de grabación
+RUTA_ETIQUETAS = None    # "inicio,fin,valor,palo" por línea
+MUESTRAS_POR_CLASE = 40
+SEMILLA = 0
+MOTORES = ["template", "descriptores"]
+
+
+def perturbar(templ, rng):
+    """Genera una ROI binaria 'realista' a partir de una plantilla."""
+    h, w = templ.shape[:2]
+
+    # Lienzo algo mayor: el glifo ya no está donde lo espera la plantilla
+    margen_y, margen_x = int(0.25 * h), int(0.25 * w)
+    lienzo = np.zeros((h + 2 * margen_y, w + 2 * margen_x), np.uint8)
+
+    escala = rng.uniform(0.85, 1.15)
+    angulo = rng.uniform(-5, 5)
+    centro = (w / 2, h / 2)
+    M = cv2.getRotationMatrix2D(centro, angulo, escala)
+    M[0, 2] += margen_x + rng.integers(-margen_x, margen_x + 1)
+    M[1, 2] += margen_y + rng.integers(-margen_y, margen_y + 1)
+    lienzo = cv2.warpAffine(templ, M, (lienzo.shape[1], lienzo.shape[0]))
+
+    lienzo = cv2.GaussianBlur(lienzo, (3, 3), rng.uniform(0.3, 1.2))
+    ruido = rng.random(lienzo.shape) < 0.01
+    lienzo[ruido] = 255 - lienzo[ruido]
+
+    # Recortamos de vuelta a un tamaño parecido al ROI real y binarizamos
+    y0 = rng.integers(0, margen_y + 1)
+    x0 = rng.integers(0, margen_x + 1)
+    roi = lienzo[y0:y0 + h + margen_y, x0:x0 + w + margen_x]
+    _, roi = cv2.threshold(roi, 127, 255, cv2.THRESH_BINARY)
+
+    # step5 solo pasa al matcher el recorte ajustado al glifo
+    if LOCALIZAR_GLIFOS:
+        roi = ajustar_plantilla(roi)
+    return roi
+
+
+def generar_muestras(plantillas, rng):
+    muestras = []
+    for clave, templ in plantillas.items():
+        for _ in range(MUESTRAS_POR_CLASE):
+            muestras.append((clave, perturbar(templ, rng)))
+    return muestras
+
+
+def rois_reales(datos, plantillas):
+    """Pasa (rois, etiquetas) de recoger_rois a [(clave, roi)] con plantilla."""
+    rois, etiquetas = datos
+    muestras = [(clave, roi) for roi, clave in zip(rois, etiquetas) if clave in plantillas]
+    if len(muestras) < len(rois):
+        print(f"  ⚠ {len(rois) - len(muestras)} ROIs con etiqueta sin plantilla, se ignoran")
+    return muestras
+
+
+def medir(nombre, plantillas, muestras, motor, banco_muestras=None):
+    t0 = time.perf_counter()
+    reconocer = crear_reconocedor(plantillas, motor, banco_muestras)
+    t_banco = time.perf_counter() - t0
+
+    aciertos = 0
+    t0 = time.perf_counter()
+    for clave, roi in muestras:
+        pred, _ = reconocer(roi)
+        if pred == clave:
+            aciertos += 1
+    t_total = time.perf_counter() - t0
+
+    n = len(muestras)
+    print(f"  {nombre:<6} {motor:<13} acierto: {100.0 * aciertos / n:6.2f}%   "
+          f"{1000.0 * t_total / n:7.3f} ms/ROI   "
+          f"(banco: {1000.0 * t_banco:.1f} ms)")
+
+
+def main():
+    rng = np.random.default_rng(SEMILLA)
+    grupos = [
+        ("valor", cargar_plantillas(PLANTILLAS_VALOR_DIR), cargar_muestras(MUESTRAS_VALOR_DIR)),
+        ("palo", cargar_plantillas(PLANTILLAS_PALO_DIR), cargar_muestras(MUESTRAS_PALO_DIR)),
+    ]
+
+    reales = None
+    if RUTA_FUENTE is not None and RUTA_ETIQUETAS is not None:
+        reales = recoger_rois(RUTA_FUENTE, RUTA_ETIQUETAS)
+        print(f"\nBenchmark con las ROIs reales de {RUTA_FUENTE}")
+    else:
+        print(f"\nBenchmark con {MUESTRAS_POR_CLASE} ROIs perturbadas por clase")
+
+    for nombre, plantillas, banco_muestras in grupos:
+        if not plantillas:
+            continue
+        if reales is not None:
+            muestras = rois_reales(reales[nombre], plantillas)
+        else:
+            muestras = generar_muestras(plantillas, rng)
+        if not muestras:
+            print(f"⚠ Sin ROIs de {nombre}")
+            continue
+        for motor in MOTORES:
+            # Descriptores con el banco de muestras de step4, como en step5
+            medir(nombre, plantillas, muestras, motor,
+                  banco_muestras if motor == "descriptores" else None)
+
+
+if __name__ == "__main__":
+    main()
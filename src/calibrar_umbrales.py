@@ -0,0 +1,227 @@
+import json
+import os
+
+import cv2
+import numpy as np
+
+from grabacion import ReproductorFrames
+from step4_guardar_plantillas import leer_etiquetas, etiqueta_de_frame
+from step5_reconocer_carta import (
+    MOTOR_RECONOCIMIENTO, PLANTILLAS_VALOR_DIR, PLANTILLAS_PALO_DIR,
+    MUESTRAS_VALOR_DIR, MUESTRAS_PALO_DIR, UMBRAL_DEFECTO, ruta_umbrales,
+    recortar_bordes_negros, segmentar_tapete_verde, encontrar_contornos_cartas,
+    extraer_carta_normalizada, orientar_carta, extraer_valor_y_palo,
+    cargar_plantillas, cargar_muestras, crear_puntuador,
+)
+
+# Calibración de umbrales de aceptación por clase.
+# Recorre un conjunto de frames etiquetados (vídeo o grabación de
+# grabacion.py + fichero "inicio,fin,valor,palo" como en step4), puntúa
+# todas las ROIs contra todas las clases de una vez y calcula:
+#   - distribución de scores por clase (correctos vs. mejor impostor)
+#   - matriz de confusión
+#   - umbral por clase: el más bajo que mantiene PRECISION_OBJETIVO
+#   - margen mínimo entre la 1ª y la 2ª clase
+# El resultado se guarda en plantillas/umbrales_<motor>.json y step5 lo
+# carga. Para la cascada de step5 hay que calibrar los dos motores.
+
+RUTA_FUENTE = None       # vídeo o directorio de grabación
+RUTA_ETIQUETAS = None
+CADA_N_FRAMES = 1
+MOTOR = MOTOR_RECONOCIMIENTO   # "template" o "descriptores"
+UMBRAL_BASE = UMBRAL_DEFECTO[MOTOR]
+
+PRECISION_OBJETIVO = 0.98   # de las aceptadas de una clase, acertadas
+MIN_MUESTRAS_CLASE = 5      # con menos, la clase se queda en UMBRAL_BASE
+RECHAZO_MAX_MARGEN = 0.02   # fracción de aciertos que el margen puede rechazar
+
+
+# ------------------ DATOS ------------------ #
+
+def recoger_rois(ruta_fuente, ruta_etiquetas):
+    """
+    Devuelve {"valor": ([rois], [etiquetas]), "palo": (...)} con la carta
+    más grande de cada frame etiquetado.
+    """
+    etiquetas = leer_etiquetas(ruta_etiquetas)
+    ya_recortado = False
+    if os.path.isdir(ruta_fuente):
+        cap = ReproductorFrames(ruta_fuente, velocidad="maxima")
+        ya_recortado = cap.recortado
+    else:
+        cap = cv2.VideoCapture(ruta_fuente)
+
+    datos = {"valor": ([], []), "palo": ([], [])}
+    n_frame = -1
+    while True:
+        ok, frame = cap.read()
+        if not ok:
+            break
+        n_frame += 1
+        if n_frame % CADA_N_FRAMES != 0:
+            continue
+        etiqueta = etiqueta_de_frame(etiquetas, n_frame)
+        if etiqueta is None:
+            continue
+
+        frame_rec = frame if ya_recortado else recortar_bordes_negros(frame)
+        contornos = encontrar_contornos_cartas(segmentar_tapete_verde(frame_rec))
+        if not contornos:
+            continue
+        cnt = max(contornos, key=cv2.contourArea)
+        carta = orientar_carta(extraer_carta_normalizada(frame_rec, cnt))
+        valor_roi, palo_roi = extraer_valor_y_palo(carta)
+
+        datos["valor"][0].append(valor_roi)
+        datos["valor"][1].append(etiqueta[0])
+        datos["palo"][0].append(palo_roi)
+        datos["palo"][1].append(etiqueta[1])
+
+    cap.release()
+    return datos
+
+
+def matriz_scores(rois, puntuar):
+    """Puntúa todas las ROIs: devuelve (clases, matriz N x C)."""
+    clases = []
+    filas = []
+    for roi in rois:
+        clases, scores = puntuar(roi)
+        filas.append(scores)
+    return list(clases), np.vstack(filas)
+
+
+# ------------------ ESTADÍSTICAS ------------------ #
+
+def mostrar_distribuciones(clases, scores, verdad):
+    print(f"  {'clase':<10} {'n':>4}  {'correcto p5/p50':>16}  {'impostor p95':>12}")
+    for c, clase in enumerate(clases):
+        filas = verdad == c
+        if not filas.any():
+            continue
+        correctos = scores[filas, c]
+        impostores = np.delete(scores[filas], c, axis=1).max(axis=1)
+        print(f"  {clase:<10} {filas.sum():>4}  "
+              f"{np.percentile(correctos, 5):7.3f}/{np.median(correctos):7.3f}  "
+              f"{np.percentile(impostores, 95):12.3f}")
+
+
+def mostrar_confusion(clases, pred, verdad):
+    n = len(clases)
+    confusion = np.zeros((n, n), np.int64)
+    np.add.at(confusion, (verdad, pred), 1)
+
+    print("  filas = verdad, columnas = predicción")
+    print("  " + " " * 10 + "".join(f"{c[:5]:>6}" for c in clases))
+    for i, clase in enumerate(clases):
+        print(f"  {clase:<10}" + "".join(f"{v:>6}" for v in confusion[i]))
+    return confusion
+
+
+# ------------------ CALIBRACIÓN ------------------ #
+
+def umbral_para_clase(scores_clase, aciertos):
+    """
+    Umbral más bajo cuyo conjunto aceptado (score >= umbral) tiene
+    precisión >= PRECISION_OBJETIVO. scores_clase son los scores de las
+    ROIs que el matcher asignó a esta clase.
+    """
+    orden = np.argsort(scores_clase)[::-1]
+    s = scores_clase[orden]
+    precision = np.cumsum(aciertos[orden]) / np.arange(1, len(s) + 1)
+    validos = np.nonzero(precision >= PRECISION_OBJETIVO)[0]
+    if len(validos) == 0:
+        return float(s[0]) + 1e-6   # nada es fiable: no aceptar
+    return float(s[validos[-1]])
+
+
+def calibrar(clases, scores, verdad):
+    orden = np.argsort(scores, axis=1)
+    pred = orden[:, -1]
+    idx = np.arange(len(scores))
+    mejor = scores[idx, pred]
+    margen = mejor - scores[idx, orden[:, -2]] if scores.shape[1] > 1 else mejor
+    acierto = pred == verdad
+
+    umbrales = {}
+    for c, clase in enumerate(clases):
+        filas = pred == c
+        if filas.sum() < MIN_MUESTRAS_CLASE:
+            continue
+        umbrales[clase] = umbral_para_clase(mejor[filas], acierto[filas])
+
+    # Margen: rechaza errores que superan el umbral sin perder más de
+    # RECHAZO_MAX_MARGEN de los aciertos aceptados
+    umbral_fila = np.array([umbrales.get(clases[p], UMBRAL_BASE) for p in pred])
+    aceptadas = mejor >= umbral_fila
+    errores = aceptadas & ~acierto
+    buenos = aceptadas & acierto
+    margen_min = 0.0
+    if errores.any() and buenos.any():
+        limite = float(np.percentile(margen[buenos], 100 * RECHAZO_MAX_MARGEN))
+        margen_min = min(limite, float(margen[errores].max()) + 1e-6)
+
+    return {"umbral_defecto": UMBRAL_BASE, "umbrales": umbrales,
+            "margen": margen_min}, pred, mejor, margen
+
+
+def resumen(nombre, mejor, margen, acierto, umbrales, clases, pred):
+    umbral_fila = np.array([umbrales["umbrales"].get(clases[p], UMBRAL_BASE)
+                            for p in pred])
+    antes = mejor >= UMBRAL_BASE
+    despues = (mejor >= umbral_fila) & (margen >= umbrales["margen"])
+    for etiqueta, acept in ((f"fijo {UMBRAL_BASE:.2f}", antes), ("calibrado", despues)):
+        n = len(mejor)
+        print(f"  {nombre} {etiqueta}: rechazadas {100.0 * (~acept).sum() / n:5.1f}%   "
+              f"errores aceptados {100.0 * (acept & ~acierto).sum() / n:5.1f}%")
+
+
+def main():
+    if RUTA_FUENTE is None or RUTA_ETIQUETAS is None:
+        print("Configura RUTA_FUENTE y RUTA_ETIQUETAS.")
+        return
+
+    print("Motor de reconocimiento:", MOTOR)
+    grupos = {
+        "valor": (PLANTILLAS_VALOR_DIR, MUESTRAS_VALOR_DIR),
+        "palo": (PLANTILLAS_PALO_DIR, MUESTRAS_PALO_DIR),
+    }
+    datos = recoger_rois(RUTA_FUENTE, RUTA_ETIQUETAS)
+    salida = {"motor": MOTOR}
+
+    for nombre, (dir_plantillas, dir_muestras) in grupos.items():
+        rois, etiquetas = datos[nombre]
+        if not rois:
+            print(f"⚠ Sin ROIs de {nombre}")
+            salida[nombre] = {"umbral_defecto": UMBRAL_BASE, "umbrales": {}, "margen": 0.0}
+            continue
+
+        muestras = cargar_muestras(dir_muestras) if MOTOR == "descriptores" else None
+        puntuar = crear_puntuador(cargar_plantillas(dir_plantillas), MOTOR, muestras)
+        clases, scores = matriz_scores(rois, puntuar)
+
+        conocidas = [i for i, e in enumerate(etiquetas) if e in clases]
+        if len(conocidas) < len(etiquetas):
+            print(f"⚠ {len(etiquetas) - len(conocidas)} ROIs con etiqueta sin plantilla, se ignoran")
+        if not conocidas:
+            print(f"⚠ Ninguna etiqueta de {nombre} tiene plantilla, no se calibra")
+            salida[nombre] = {"umbral_defecto": UMBRAL_BASE, "umbrales": {}, "margen": 0.0}
+            continue
+        scores = scores[conocidas]
+        verdad = np.array([clases.index(etiquetas[i]) for i in conocidas], dtype=int)
+
+        print(f"\n===== {nombre.upper()} ({len(verdad)} ROIs) =====")
+        mostrar_distribuciones(clases, scores, verdad)
+        umbrales, pred, mejor, margen = calibrar(clases, scores, verdad)
+        mostrar_confusion(clases, pred, verdad)
+        resumen(nombre, mejor, margen, pred == verdad, umbrales, clases, pred)
+        salida[nombre] = umbrales
+
+    ruta = ruta_umbrales(MOTOR)
+    with open(ruta, "w", encoding="utf-8") as f:
+        json.dump(salida, f, indent=2, ensure_ascii=False)
+    print("\nUmbrales guardados en:", ruta)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+import cv2
+import numpy as np
+
+# Motor de reconocimiento alternativo a matchTemplate:
+# cada ROI (valor o palo) se resume en un vector fijo y pequeño
+#   - 7 momentos de Hu del contorno más grande (forma del glifo)
+#   - un HOG reducido (4x4 celdas x 9 orientaciones) del glifo recortado
+# Los vectores de las plantillas se calculan una sola vez y la
+# clasificación es un producto matriz-vector (similitud coseno).
+
+TAM_GLIFO = 32          # el glifo recortado se lleva a 32x32
+TAM_CELDA = 8           # celdas HOG de 8x8 -> 4x4 celdas
+N_ORIENTACIONES = 9     # bins de orientación (0..180 grados)
+PESO_HU = 0.5           # peso relativo de Hu frente al HOG
+AREA_MIN_GLIFO = 0.10   # trozos < 10% del contorno mayor se ignoran
+
+
+# ------------------ GLIFO ------------------ #
+
+def recortar_glifo(roi_bin):
+    """
+    Recorta la ROI binaria (glifo en blanco) al rectángulo que engloba
+    los contornos significativos. Devuelve (recorte, contorno_mayor)
+    o (None, None) si la ROI está vacía.
+    """
+    # Las plantillas redimensionadas traen grises: volvemos a binarizar
+    _, roi_bin = cv2.threshold(roi_bin, 127, 255, cv2.THRESH_BINARY)
+    contornos, _ = cv2.findContours(roi_bin, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    if not contornos:
+        return None, None
+
+    mayor = max(contornos, key=cv2.contourArea)
+    area_mayor = cv2.contourArea(mayor)
+    if area_mayor <= 0:
+        return None, None
+
+    # Juntamos los trozos grandes (p. ej. el "1" y el "0" del 10)
+    utiles = [c for c in contornos if cv2.contourArea(c) >= AREA_MIN_GLIFO * area_mayor]
+    x, y, w, h = cv2.boundingRect(np.vstack(utiles))
+    return roi_bin[y:y + h, x:x + w], mayor
+
+
+# ------------------ DESCRIPTORES ------------------ #
+
+def momentos_hu(contorno):
+    """Momentos de Hu en escala logarítmica (comparables entre sí)."""
+    hu = cv2.HuMoments(cv2.moments(contorno)).flatten()
+    return -np.sign(hu) * np.log10(np.abs(hu) + 1e-30)
+
+
+def hog_reducido(glifo):
+    """
+    HOG simplificado sin bloques: histograma de orientaciones
+    (ponderado por magnitud del gradiente) en cada celda.
+    """
+    img = cv2.resize(glifo, (TAM_GLIFO, TAM_GLIFO),
+                     interpolation=cv2.INTER_AREA).astype(np.float32)
+    gx = cv2.Sobel(img, cv2.CV_32F, 1, 0, ksize=1)
+    gy = cv2.Sobel(img, cv2.CV_32F, 0, 1, ksize=1)
+    mag, ang = cv2.cartToPolar(gx, gy, angleInDegrees=True)
+
+    bins = ((ang % 180.0) * N_ORIENTACIONES / 180.0).astype(np.int32)
+    bins = np.minimum(bins, N_ORIENTACIONES - 1)
+
+    # Índice de celda de cada píxel -> histograma de todas las celdas a la vez
+    n_celdas = TAM_GLIFO // TAM_CELDA
+    fila = np.arange(TAM_GLIFO) // TAM_CELDA
+    celda = fila[:, None] * n_celdas + fila[None, :]
+    indice = (celda * N_ORIENTACIONES + bins).ravel()
+    hist = np.bincount(indice, weights=mag.ravel(),
+                       minlength=n_celdas * n_celdas * N_ORIENTACIONES)
+    return hist.astype(np.float32)
+
+
+def _normalizar(v):
+    n = np.linalg.norm(v)
+    return v / n if n > 0 else v
+
+
+def calcular_descriptor(roi_bin):
+    """
+    Vector de longitud fija (7 + 144) normalizado L2, o None si la ROI
+    no contiene ningún glifo.
+    """
+    glifo, mayor = recortar_glifo(roi_bin)
+    if glifo is None:
+        return None
+    hu = _normalizar(momentos_hu(mayor).astype(np.float32))
+    hog = _normalizar(hog_reducido(glifo))
+    return _normalizar(np.concatenate([PESO_HU * hu, hog]))
+
+
+# ------------------ BANCO + CLASIFICACIÓN ------------------ #
+
+def construir_banco_descriptores(plantillas, muestras=None):
+    """
+    Precalcula los descriptores de todas las plantillas y, si se dan,
+    de las muestras capturadas con step4 ({clave: [img, ...]}).
+    Una clase puede ocupar varias filas. Devuelve
+    {"claves": [...], "matriz": ndarray (N x D)}.
+    """
+    imagenes = [(clave, templ) for clave, templ in plantillas.items()]
+    for clave, imgs in (muestras or {}).items():
+        imagenes.extend((clave, img) for img in imgs)
+
+    claves = []
+    filas = []
+    for clave, img in imagenes:
+        desc = calcular_descriptor(img)
+        if desc is None:
+            print("  ⚠ Imagen sin glifo, se ignora:", clave)
+            continue
+        claves.append(clave)
+        filas.append(desc)
+
+    if not filas:
+        return {"claves": [], "matriz": np.zeros((0, 0), np.float32),
+                "clases": [], "fila_a_clase": np.zeros(0, np.int64)}
+
+    # Cada fila apunta a su clase para reducir a un score por clase
+    clases = sorted(set(claves))
+    fila_a_clase = np.array([clases.index(c) for c in claves])
+    return {"claves": claves, "matriz": np.vstack(filas),
+            "clases": clases, "fila_a_clase": fila_a_clase}
+
+
+def puntuar_descriptores(roi, banco):
+    """
+    Devuelve (clases, scores): la mejor similitud coseno de cada clase
+    (-1.0 en todas si la ROI no tiene glifo).
+    """
+    scores_clase = np.full(len(banco["clases"]), -1.0, np.float32)
+    if not banco["clases"]:
+        return banco["clases"], scores_clase
+    desc = calcular_descriptor(roi)
+    if desc is None:
+        return banco["clases"], scores_clase
+
+    scores = banco["matriz"] @ desc
+    np.maximum.at(scores_clase, banco["fila_a_clase"], scores)
+    return banco["clases"], scores_clase
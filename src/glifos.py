@@ -0,0 +1,147 @@
+import cv2
+
+# Localización de glifos dentro de la esquina ya binarizada.
+# En vez de partir la esquina al 55% de su altura, buscamos componentes
+# conexas, las agrupamos por filas (el "1" y el "0" del 10 quedan juntos)
+# y devolvemos recortes ajustados del valor (fila superior) y del palo
+# (fila inmediatamente inferior, solapando en x con el valor).
+
+AREA_MIN_REL = 0.004    # componentes < 0.4% de la esquina = ruido
+AREA_MAX_REL = 0.50     # componentes enormes = sombra / borde de carta
+SOLAPE_MIN = 0.5        # solape vertical mínimo para estar en la misma fila
+HUECO_MAX_REL = 0.6     # hueco horizontal máximo (relativo a la altura)
+MARGEN = 2              # píxeles extra alrededor de cada recorte
+
+BORDE = 2               # marco fijo que se borra siempre
+FRACCION_BARRA = 0.6    # fila/columna de borde con > 60% de tinta = canto o tapete
+BARRA_MAX_REL = 0.25    # la barra del borde no ocupa más de 1/4 de la esquina
+
+
+def limpiar_borde(binaria):
+    """
+    Borra el marco exterior y las barras de tinta pegadas al borde
+    superior e izquierdo (canto de la carta o tapete que deja el warp),
+    sin tocar los glifos que las tocan.
+    """
+    limpia = binaria.copy()
+    ch, cw = limpia.shape[:2]
+    limpia[:BORDE, :] = 0
+    limpia[ch - BORDE:, :] = 0
+    limpia[:, :BORDE] = 0
+    limpia[:, cw - BORDE:] = 0
+
+    # Columnas desde la izquierda casi llenas de tinta: barra del borde
+    col = (limpia > 0).mean(axis=0)
+    x = BORDE
+    while x < int(BARRA_MAX_REL * cw) and col[x] > FRACCION_BARRA:
+        x += 1
+    if x > BORDE:
+        limpia[:, :x + 1] = 0   # +1: la columna de transición
+
+    fila = (limpia > 0).mean(axis=1)
+    y = BORDE
+    while y < int(BARRA_MAX_REL * ch) and fila[y] > FRACCION_BARRA:
+        y += 1
+    if y > BORDE:
+        limpia[:y + 1, :] = 0
+    return limpia
+
+
+def _componentes_validas(binaria):
+    """Devuelve las cajas [x, y, w, h] de las componentes que pueden ser glifo."""
+    ch, cw = binaria.shape[:2]
+    n, _, stats, _ = cv2.connectedComponentsWithStats(binaria, connectivity=8)
+
+    cajas = []
+    for i in range(1, n):  # 0 = fondo
+        x, y, w, h, area = (int(v) for v in stats[i])
+        if AREA_MIN_REL * ch * cw <= area <= AREA_MAX_REL * ch * cw:
+            cajas.append([x, y, w, h, area])
+    return cajas
+
+
+def _misma_fila(a, b):
+    """True si dos cajas están a la misma altura y pegadas en horizontal."""
+    ax, ay, aw, ah = a[:4]
+    bx, by, bw, bh = b[:4]
+    solape = min(ay + ah, by + bh) - max(ay, by)
+    if solape < SOLAPE_MIN * min(ah, bh):
+        return False
+    hueco = max(ax, bx) - min(ax + aw, bx + bw)
+    return hueco <= HUECO_MAX_REL * min(ah, bh)
+
+
+def _unir(a, b):
+    x0 = min(a[0], b[0])
+    y0 = min(a[1], b[1])
+    x1 = max(a[0] + a[2], b[0] + b[2])
+    y1 = max(a[1] + a[3], b[1] + b[3])
+    return [x0, y0, x1 - x0, y1 - y0, a[4] + b[4]]
+
+
+def _solape_x(a, b):
+    return min(a[0] + a[2], b[0] + b[2]) - max(a[0], b[0])
+
+
+def agrupar_filas(cajas):
+    """
+    Agrupa las cajas que forman un mismo símbolo (p. ej. "1" + "0").
+    Devuelve los grupos [x, y, w, h, area] ordenados de arriba a abajo.
+    """
+    grupos = []
+    for caja in sorted(cajas, key=lambda c: c[0]):
+        for i, g in enumerate(grupos):
+            if _misma_fila(g, caja):
+                grupos[i] = _unir(g, caja)
+                break
+        else:
+            grupos.append(list(caja))
+    return sorted(grupos, key=lambda g: g[1])
+
+
+def localizar_valor_y_palo(binaria):
+    """
+    Devuelve (caja_valor, caja_palo) con cajas [x, y, w, h] ajustadas,
+    o None si no se encuentran dos símbolos uno encima del otro.
+    """
+    grupos = agrupar_filas(_componentes_validas(limpiar_borde(binaria)))
+    if len(grupos) < 2:
+        return None
+
+    valor = grupos[0]
+    # El palo está justo debajo del valor y solapa con él en x; el símbolo
+    # grande del centro de la carta, si asoma, queda más a la derecha
+    debajo = [g for g in grupos[1:]
+              if g[1] >= valor[1] + valor[3] // 2 and _solape_x(valor, g) > 0]
+    if not debajo:
+        return None
+
+    palo = min(debajo, key=lambda g: g[1])
+    return valor[:4], palo[:4]
+
+
+def ajustar_plantilla(templ):
+    """
+    Recorta una plantilla (capturada con el corte fijo) al símbolo que
+    contiene: el grupo de la componente más grande. Así se compara con
+    los recortes ajustados de localizar_valor_y_palo.
+    """
+    _, binaria = cv2.threshold(templ, 127, 255, cv2.THRESH_BINARY)
+    cajas = _componentes_validas(binaria)
+    if not cajas:
+        return templ
+
+    mayor = max(cajas, key=lambda c: c[4])
+    for g in agrupar_filas(cajas):
+        if g[0] <= mayor[0] and g[1] <= mayor[1] and \
+                g[0] + g[2] >= mayor[0] + mayor[2] and g[1] + g[3] >= mayor[1] + mayor[3]:
+            return recortar(templ, g[:4])
+    return templ
+
+
+def recortar(binaria, caja):
+    ch, cw = binaria.shape[:2]
+    x, y, w, h = caja[:4]
+    x0, y0 = max(x - MARGEN, 0), max(y - MARGEN, 0)
+    x1, y1 = min(x + w + MARGEN, cw), min(y + h + MARGEN, ch)
+    return binaria[y0:y1, x0:x1]
@@ -0,0 +1,236 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+# Grabación y reproducción determinista de frames.
+#
+# Formato de una grabación (un directorio):
+#   chunk_00000.bin, chunk_00001.bin, ...  frames codificados (JPEG por
+#                                          defecto) uno tras otro
+#   indice.csv    frame,vivo,descartados,chunk,offset,longitud,timestamp
+#                 vivo = número de frame en la sesión en vivo y
+#                 descartados = frames perdidos hasta ese momento, así se
+#                 ve dónde hay huecos respecto a lo que procesó el pipeline
+#
+# El índice permite saltar a cualquier frame leyendo solo sus bytes, sin
+# decodificar desde el principio. La codificación va en un pool de hilos y
+# la escritura en otro hilo, para no frenar el bucle en vivo.
+
+FRAMES_POR_CHUNK = 300   # ~10 s a 30 fps
+FORMATO = ".jpg"         # ".jpg" (rápido) o ".png" (sin pérdidas, ~100 ms/frame a 720p)
+PARAMS_FORMATO = {
+    ".png": [cv2.IMWRITE_PNG_COMPRESSION, 1],
+    ".jpg": [cv2.IMWRITE_JPEG_QUALITY, 95],
+}
+N_CODIFICADORES = 2      # hilos codificando en paralelo
+COLA_MAX = 64            # frames pendientes antes de empezar a descartar
+
+NOMBRE_INDICE = "indice.csv"
+COLUMNAS_INDICE = "frame,vivo,descartados,chunk,offset,longitud,timestamp"
+
+
+def _ruta_chunk(directorio, n):
+    return os.path.join(directorio, f"chunk_{n:05d}.bin")
+
+
+class GrabadorFrames:
+    """
+    Uso:
+        grabador = GrabadorFrames("grabaciones/partida1")
+        try:
+            grabador.grabar(frame)   # en cada iteración del bucle
+        finally:
+            grabador.cerrar()
+    """
+
+    def __init__(self, directorio, recortado=True,
+                 frames_por_chunk=FRAMES_POR_CHUNK, formato=FORMATO):
+        os.makedirs(directorio, exist_ok=True)
+        self.directorio = directorio
+        self.frames_por_chunk = frames_por_chunk
+        self.formato = formato
+        self.descartados = 0
+        self._vivo = 0
+        self._cola = queue.Queue(maxsize=COLA_MAX)
+        self._pool = ThreadPoolExecutor(max_workers=N_CODIFICADORES)
+
+        self._indice = open(os.path.join(directorio, NOMBRE_INDICE), "w", encoding="utf-8")
+        self._indice.write(f"# recortado={int(recortado)} formato={formato}\n")
+        self._indice.write(COLUMNAS_INDICE + "\n")
+        self._indice.flush()
+
+        self._hilo = threading.Thread(target=self._escribir, daemon=True)
+        self._hilo.start()
+
+    def grabar(self, frame, timestamp=None):
+        """
+        Manda el frame a codificar; si el disco no da abasto se descarta
+        (no bloquea). Cada llamada cuenta como un frame en vivo.
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        vivo = self._vivo
+        self._vivo += 1
+        if self._cola.full():
+            self.descartados += 1
+            return
+
+        params = PARAMS_FORMATO.get(self.formato, [])
+        futuro = self._pool.submit(cv2.imencode, self.formato, frame.copy(), params)
+        self._cola.put_nowait((vivo, self.descartados, timestamp, futuro))
+
+    def cerrar(self):
+        self._cola.put(None)
+        self._hilo.join()
+        self._pool.shutdown()
+        self._indice.close()
+        print(f"Grabación cerrada: {self._vivo - self.descartados} frames en "
+              f"{self.directorio} ({self.descartados} descartados de {self._vivo})")
+
+    def _escribir(self):
+        # Escribe en el orden de llegada aunque se codifique en paralelo
+        n = 0
+        chunk_actual = -1
+        f = None
+        while True:
+            item = self._cola.get()
+            if item is None:
+                break
+            vivo, descartados, timestamp, futuro = item
+            ok, data = futuro.result()
+            if not ok:
+                continue
+
+            chunk = n // self.frames_por_chunk
+            if chunk != chunk_actual:
+                if f is not None:
+                    f.close()
+                f = open(_ruta_chunk(self.directorio, chunk), "wb")
+                chunk_actual = chunk
+
+            offset = f.tell()
+            f.write(data.tobytes())
+            f.flush()
+            # Índice al día tras cada frame: si el programa cae, lo escrito se puede leer
+            self._indice.write(f"{n},{vivo},{descartados},{chunk},{offset},"
+                               f"{len(data)},{timestamp:.6f}\n")
+            self._indice.flush()
+            n += 1
+
+        if f is not None:
+            f.close()
+
+
+class ReproductorFrames:
+    """
+    Lee una grabación con la misma interfaz básica que cv2.VideoCapture
+    (isOpened, read, set/get de CAP_PROP_POS_FRAMES, release), así el
+    pipeline no distingue entre cámara y grabación.
+
+    velocidad: "original" respeta los tiempos grabados,
+               "maxima" entrega los frames tan rápido como se pidan.
+    """
+
+    def __init__(self, directorio, velocidad="original"):
+        self.directorio = directorio
+        self.velocidad = velocidad
+        self.recortado = False
+        self.vivo = -1          # nº de frame en vivo del último frame leído
+        self._pos = 0
+        self._f = None
+        self._chunk_abierto = -1
+        self._t0_grabacion = None
+        self._t0_real = None
+
+        ruta = os.path.join(directorio, NOMBRE_INDICE)
+        if not os.path.isfile(ruta):
+            print("⚠ Grabación no encontrada:", directorio)
+            self._indice = np.zeros((0, 7))
+            return
+
+        with open(ruta, encoding="utf-8") as f:
+            cabecera = f.readline()
+            f.readline()  # nombres de columna
+            # Si el programa cayó a mitad de línea, la última queda incompleta
+            filas = [linea.split(",") for linea in f]
+        self.recortado = "recortado=1" in cabecera
+        n_col = len(COLUMNAS_INDICE.split(","))
+        self._indice = np.array([[float(v) for v in fila] for fila in filas
+                                 if len(fila) == n_col and fila[-1].endswith("\n")])
+        if len(self._indice) == 0:
+            self._indice = np.zeros((0, n_col))
+
+        descartados = int(self._indice[-1, 2]) if len(self._indice) else 0
+        if descartados:
+            print(f"⚠ La grabación perdió {descartados} frames en vivo (ver columna 'vivo')")
+
+    def isOpened(self):
+        return len(self._indice) > 0
+
+    def __len__(self):
+        return len(self._indice)
+
+    def ir_a(self, n):
+        """Salta al frame n usando el índice (no decodifica nada)."""
+        self._pos = max(0, min(int(n), len(self._indice)))
+        self._t0_real = None
+
+    def ir_a_vivo(self, vivo):
+        """Salta al primer frame grabado con número en vivo >= vivo."""
+        self.ir_a(np.searchsorted(self._indice[:, 1], vivo))
+
+    def set(self, prop, valor):
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            self.ir_a(valor)
+            return True
+        return False
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            return float(self._pos)
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return float(len(self._indice))
+        return 0.0
+
+    def read(self):
+        if self._pos >= len(self._indice):
+            return False, None
+
+        _, vivo, _, chunk, offset, longitud, timestamp = self._indice[self._pos]
+        chunk = int(chunk)
+        if chunk != self._chunk_abierto:
+            if self._f is not None:
+                self._f.close()
+            self._f = open(_ruta_chunk(self.directorio, chunk), "rb")
+            self._chunk_abierto = chunk
+
+        self._f.seek(int(offset))
+        data = np.frombuffer(self._f.read(int(longitud)), dtype=np.uint8)
+        frame = cv2.imdecode(data, cv2.IMREAD_UNCHANGED)
+        self._pos += 1
+        self.vivo = int(vivo)
+
+        if self.velocidad == "original":
+            self._esperar(timestamp)
+        return frame is not None, frame
+
+    def _esperar(self, timestamp):
+        # Mantiene el ritmo grabado a partir del primer frame leído tras un salto
+        ahora = time.perf_counter()
+        if self._t0_real is None:
+            self._t0_real, self._t0_grabacion = ahora, timestamp
+            return
+        retraso = (timestamp - self._t0_grabacion) - (ahora - self._t0_real)
+        if retraso > 0:
+            time.sleep(retraso)
+
+    def release(self):
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+        self._chunk_abierto = -1
@@ -0,0 +1,191 @@
+import time
+
+import cv2
+import numpy as np
+
+# Planificación del reconocimiento con presupuesto de tiempo por frame.
+#
+# - Las cartas se siguen entre frames por la posición de su centro.
+# - Solo se reconocen las que lo necesitan, por prioridad:
+#     0 nueva, 1 movida, 2 con "?" (baja confianza), 3 re-verificación
+#   Las ya confirmadas y quietas reutilizan su nombre.
+# - Se procesan cartas hasta agotar el presupuesto; el resto pasa al
+#   siguiente frame (siguen en cola y van ganando antigüedad).
+# - Si aun así no se llega a FPS_OBJETIVO, el pipeline se degrada:
+#     "normal"                 motor elegido, a resolución completa
+#     "segmentacion_reducida"  segmentación a media resolución y cascada
+#                              (descriptores y, si no deciden, el motor)
+#     "solo_cascada"           solo la primera etapa de la cascada y sin
+#                              re-verificaciones
+
+FPS_OBJETIVO = 25
+FRACCION_PRESUPUESTO = 0.6   # parte del frame que se puede gastar en cartas
+
+DIST_ASOCIACION = 0.5   # centro a < 0.5 x tamaño de la carta = misma carta
+DIST_MOVIDA = 0.15      # desplazamiento (relativo) que obliga a reconocer
+REVERIFICAR_FRAMES = 90 # una carta confirmada se revisa cada ~3 s
+FRAMES_OLVIDO = 10      # sin verla N frames, la pista se borra
+
+MODOS = ["normal", "segmentacion_reducida", "solo_cascada"]
+FRAMES_HISTERESIS = 15  # frames seguidos por encima/debajo para cambiar
+SUBIR_SI = 1.10         # tiempo medio > 110% del objetivo -> degradar
+BAJAR_SI = 0.70         # tiempo medio < 70% del objetivo -> recuperar
+ESCALA_REDUCIDA = 0.5
+
+
+# ------------------ SEGUIMIENTO + PRIORIDAD ------------------ #
+
+class PlanificadorCartas:
+
+    def __init__(self):
+        self.pistas = []
+        self._siguiente_id = 0
+
+    def asociar(self, contornos, n_frame):
+        """
+        Empareja los contornos del frame con las pistas existentes (centro
+        más cercano) y crea pistas nuevas. Devuelve las pistas visibles.
+        """
+        libres = list(self.pistas)
+        visibles = []
+        for cnt in contornos:
+            x, y, w, h = cv2.boundingRect(cnt)
+            centro = np.array([x + w / 2.0, y + h / 2.0])
+            tam = float(max(w, h))
+
+            mejor = None
+            mejor_dist = DIST_ASOCIACION * tam
+            for pista in libres:
+                dist = np.linalg.norm(pista["centro"] - centro)
+                if dist < mejor_dist:
+                    mejor, mejor_dist = pista, dist
+
+            if mejor is None:
+                mejor = {"id": self._siguiente_id, "valor": None, "palo": None,
+                         "centro_reconocido": None, "frame_reconocida": -1}
+                self._siguiente_id += 1
+                self.pistas.append(mejor)
+            else:
+                libres.remove(mejor)
+
+            mejor.update(contorno=cnt, rect=(x, y, w, h), centro=centro,
+                         tam=tam, vista=n_frame)
+            visibles.append(mejor)
+
+        self.pistas = [p for p in self.pistas if n_frame - p["vista"] <= FRAMES_OLVIDO]
+        return visibles
+
+    @staticmethod
+    def prioridad(pista, n_frame):
+        """0 nueva, 1 movida, 2 baja confianza, 3 re-verificar, None = al día."""
+        if pista["valor"] is None:
+            return 0
+        desplazamiento = np.linalg.norm(pista["centro"] - pista["centro_reconocido"])
+        if desplazamiento > DIST_MOVIDA * pista["tam"]:
+            return 1
+        if pista["valor"] == "?" or pista["palo"] == "?":
+            return 2
+        if n_frame - pista["frame_reconocida"] > REVERIFICAR_FRAMES:
+            return 3
+        return None
+
+    def cola(self, visibles, n_frame, reverificar=True):
+        """
+        Pistas que necesitan reconocimiento, de más a menos urgente.
+        Con reverificar=False las confirmadas y quietas no entran.
+        """
+        pendientes = []
+        for pista in visibles:
+            p = self.prioridad(pista, n_frame)
+            if p == 3 and not reverificar:
+                continue
+            if p is not None:
+                # A igual prioridad, primero la que lleva más tiempo esperando
+                pendientes.append((p, pista["frame_reconocida"], pista["id"], pista))
+        pendientes.sort(key=lambda t: t[:3])
+        return [t[3] for t in pendientes]
+
+    @staticmethod
+    def actualizar(pista, valor, palo, n_frame):
+        pista.update(valor=valor, palo=palo,
+                     centro_reconocido=pista["centro"].copy(),
+                     frame_reconocida=n_frame)
+
+
+# ------------------ PRESUPUESTO + DEGRADACIÓN ------------------ #
+
+class ControlDegradacion:
+
+    def __init__(self, fps_objetivo=FPS_OBJETIVO):
+        self.objetivo_ms = 1000.0 / fps_objetivo
+        self.nivel = 0
+        self.media_ms = self.objetivo_ms
+        self._racha = 0
+
+    @property
+    def modo(self):
+        return MODOS[self.nivel]
+
+    @property
+    def segmentacion_reducida(self):
+        return self.nivel >= 1
+
+    @property
+    def cascada(self):
+        return self.nivel >= 1
+
+    @property
+    def solo_cascada(self):
+        return self.nivel >= 2
+
+    def presupuesto_ms(self):
+        return FRACCION_PRESUPUESTO * self.objetivo_ms
+
+    def registrar(self, ms_frame):
+        """Actualiza la media del tiempo de frame y cambia de modo si toca."""
+        self.media_ms = 0.9 * self.media_ms + 0.1 * ms_frame
+
+        if self.media_ms > SUBIR_SI * self.objetivo_ms and self.nivel < len(MODOS) - 1:
+            self._racha = self._racha + 1 if self._racha > 0 else 1
+        elif self.media_ms < BAJAR_SI * self.objetivo_ms and self.nivel > 0:
+            self._racha = self._racha - 1 if self._racha < 0 else -1
+        else:
+            self._racha = 0
+
+        if abs(self._racha) >= FRAMES_HISTERESIS:
+            self.nivel += 1 if self._racha > 0 else -1
+            self._racha = 0
+            print(f"Modo -> {self.modo} (media {self.media_ms:.1f} ms, "
+                  f"objetivo {self.objetivo_ms:.1f} ms)")
+
+
+def ms_desde(t0):
+    return 1000.0 * (time.perf_counter() - t0)
+
+
+def segmentar_reducido(frame, segmentar, encontrar_contornos, escala=ESCALA_REDUCIDA,
+                       min_area=3000, max_area=200000):
+    """
+    Segmenta a menor resolución y devuelve los contornos ya escalados al
+    frame original (así el warp de la carta sigue usando la imagen completa).
+    """
+    pequeno = cv2.resize(frame, None, fx=escala, fy=escala, interpolation=cv2.INTER_AREA)
+    mask = segmentar(pequeno)
+    area = escala * escala
+    contornos = encontrar_contornos(mask, min_area=min_area * area, max_area=max_area * area)
+    return [np.round(c / escala).astype(np.int32) for c in contornos]
+
+
+def reconocer_en_cascada(roi, etapas, solo_primera=False):
+    """
+    etapas: lista de (puntuar, decidir_etapa). Se prueba la primera (barata);
+    solo si devuelve "?" se pasa a la siguiente. Devuelve (clave, score).
+    """
+    clave, score = "?", -1.0
+    for i, (puntuar, decidir_etapa) in enumerate(etapas):
+        if i > 0 and solo_primera:
+            break
+        clave, score = decidir_etapa(*puntuar(roi))
+        if clave != "?":
+            break
+    return clave, score
@@ -2,12 +2,39 @@ import cv2
 import numpy as np
 import os
 
+from aumentos import aumentar, binarizar_otsu_lote
+from glifos import localizar_valor_y_palo, recortar
+from grabacion import ReproductorFrames
+
 CAM_INDEX = 1  # índice de tu iVCam
 
-# ==== AJUSTA ESTOS NOMBRES ANTES DE EJECUTAR ====
+SRC_DIR = os.path.dirname(__file__)
+ROOT_DIR = os.path.dirname(SRC_DIR)
+PLANTILLAS_DIR = os.path.join(ROOT_DIR, "plantillas")
+MUESTRAS_DIR = os.path.join(PLANTILLAS_DIR, "muestras")
+
+# Igual que en step5: recortes ajustados de valor/palo (glifos.py)
+LOCALIZAR_GLIFOS = True
+
+# ==== SESIÓN DE CAPTURA ====
+# Etiqueta inicial (en la sesión de cámara se cambia con la tecla 'n')
 NOMBRE_VALOR = "9"           # "A", "2", ..., "K"
 NOMBRE_PALO  = "trebol"   # "picas", "corazones", "trebol", "diamantes"
-# =================================================
+
+# Fuente: None = cámara en vivo; o ruta a un vídeo (o a una grabación de
+# grabacion.py) + fichero de etiquetas con líneas "inicio,fin,valor,palo"
+# (frames, ambos incluidos)
+RUTA_VIDEO = None
+RUTA_ETIQUETAS = None
+
+MUESTRAS_POR_CARTA = 10  # máximo de capturas reales por carta (valor, palo)
+CADA_N_FRAMES = 5        # en captura continua, 1 de cada N frames
+COPIAS_AUMENTO = 5       # variantes aumentadas por captura real
+SEMILLA = 0
+# ===========================
+
+VALORES = ["A", "2", "3", "4", "5", "6", "7", "8", "9", "10", "J", "Q", "K"]
+PALOS = ["picas", "corazones", "trebol", "diamantes"]
 
 
 def recortar_bordes_negros(frame):
@@ -86,45 +113,148 @@ def orientar_carta(carta_norm):
         return cv2.rotate(carta_norm, cv2.ROTATE_90_CLOCKWISE)
 
 
-def extraer_valor_y_palo(carta_orientada):
+def extraer_valor_y_palo(carta_orientada, con_gris=False):
+    """
+    Devuelve (valor, palo) binarizados. Con con_gris devuelve además los
+    mismos recortes en gris invertido (glifo claro), para el aumento de datos.
+    """
     h, w = carta_orientada.shape[:2]
     corner = carta_orientada[0:int(0.40 * h), 0:int(0.45 * w)]
     gray = cv2.cvtColor(corner, cv2.COLOR_BGR2GRAY)
     _, binaria = cv2.threshold(gray, 0, 255,
                                cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
-    ch, cw = binaria.shape
-    corte = int(ch * 0.55)
-    valor = binaria[0:corte, :]
-    palo = binaria[corte:ch, :]
+    gris_inv = 255 - gray
+
+    cajas = localizar_valor_y_palo(binaria) if LOCALIZAR_GLIFOS else None
+    if cajas is not None:
+        recortes = [recortar(img, caja) for caja in cajas for img in (binaria, gris_inv)]
+    else:
+        # Sin glifos localizados: corte fijo al 55% de la altura
+        ch, cw = binaria.shape
+        corte = int(ch * 0.55)
+        recortes = [binaria[0:corte, :], gris_inv[0:corte, :],
+                    binaria[corte:ch, :], gris_inv[corte:ch, :]]
+
+    valor, valor_g, palo, palo_g = recortes
+    if con_gris:
+        return valor, palo, valor_g, palo_g
     return valor, palo
 
 
-def main():
-    print("Directorio de trabajo actual:", os.getcwd())
-    os.makedirs("plantillas/valor", exist_ok=True)
-    os.makedirs("plantillas/palo", exist_ok=True)
+def imwrite_unicode(path, img):
+    ok, data = cv2.imencode(os.path.splitext(path)[1], img)
+    if ok:
+        data.tofile(path)
+    return ok
+
+
+def extraer_plantillas(frame, ya_recortado=False):
+    """
+    Devuelve (carta_orientada, valor_t, palo_t, valor_g, palo_g) de la
+    carta más grande del frame (binarias y en gris invertido), o None si
+    no hay ninguna.
+    """
+    if not ya_recortado:
+        frame = recortar_bordes_negros(frame)
+    mask = segmentar_tapete_verde(frame)
+    contornos = encontrar_contornos_cartas(mask)
+    if not contornos:
+        return None
+
+    cnt = max(contornos, key=cv2.contourArea)
+    carta_norm = extraer_carta_normalizada(frame, cnt)
+    carta_orientada = orientar_carta(carta_norm)
+    valor, palo, valor_g, palo_g = extraer_valor_y_palo(carta_orientada, con_gris=True)
 
+    valor_t = cv2.resize(valor, (60, 80))
+    palo_t  = cv2.resize(palo,  (60, 60))
+    valor_g = cv2.resize(valor_g, (60, 80))
+    palo_g  = cv2.resize(palo_g,  (60, 60))
+    return carta_orientada, valor_t, palo_t, valor_g, palo_g
+
+
+def nueva_muestras():
+    return {"valor": {}, "palo": {}, "cartas": {}}
+
+
+def anadir_muestra(muestras, valor, palo, valor_g, palo_g):
+    """
+    Guarda la captura (en gris) si la carta aún no ha llegado al máximo.
+    El límite es por carta, así cada palo recibe muestras de todos los valores.
+    """
+    n = muestras["cartas"].get((valor, palo), 0)
+    if n >= MUESTRAS_POR_CARTA:
+        return False
+    muestras["cartas"][(valor, palo)] = n + 1
+    muestras["valor"].setdefault(valor, []).append(valor_g)
+    muestras["palo"].setdefault(palo, []).append(palo_g)
+    return True
+
+
+def pedir_etiqueta(valor, palo):
+    texto = input(f"Nueva etiqueta 'valor palo' (actual: {valor} {palo}): ").split()
+    if len(texto) == 2 and texto[0].upper() in VALORES and texto[1].lower() in PALOS:
+        return texto[0].upper(), texto[1].lower()
+    print("  ⚠ Etiqueta no válida, se mantiene:", valor, palo)
+    return valor, palo
+
+
+def leer_etiquetas(ruta):
+    """
+    Lee las líneas 'inicio,fin,valor,palo' (se ignoran vacías y #).
+    Las líneas mal formadas o con valor/palo fuera de VALORES/PALOS se
+    avisan y se saltan.
+    """
+    etiquetas = []
+    with open(ruta, encoding="utf-8") as f:
+        for n_linea, linea in enumerate(f, 1):
+            linea = linea.strip()
+            if not linea or linea.startswith("#"):
+                continue
+            campos = [c.strip() for c in linea.split(",")]
+            if len(campos) != 4 or not campos[0].isdigit() or not campos[1].isdigit():
+                print(f"  ⚠ {ruta}:{n_linea} mal formada, se ignora: {linea}")
+                continue
+            inicio, fin, valor, palo = campos
+            valor, palo = valor.upper(), palo.lower()
+            if valor not in VALORES or palo not in PALOS:
+                print(f"  ⚠ {ruta}:{n_linea} etiqueta no válida, se ignora: {valor} {palo}")
+                continue
+            etiquetas.append((int(inicio), int(fin), valor, palo))
+    return etiquetas
+
+
+def etiqueta_de_frame(etiquetas, n):
+    for inicio, fin, valor, palo in etiquetas:
+        if inicio <= n <= fin:
+            return valor, palo
+    return None
+
+
+def sesion_camara(muestras):
+    """
+    Teclas: 'n' cambiar etiqueta, 's' capturar una muestra,
+    'c' activar/desactivar captura continua, 'q' terminar y guardar.
+    """
     cap = cv2.VideoCapture(CAM_INDEX, cv2.CAP_DSHOW)
+    if not cap.isOpened():
+        print("No se pudo abrir la cámara.")
+        return
+
+    valor, palo = NOMBRE_VALOR, NOMBRE_PALO
+    continua = False
+    n_frame = 0
+    print("Etiqueta actual:", valor, palo)
 
     while True:
         ok, frame = cap.read()
         if not ok:
             break
+        n_frame += 1
 
-        frame = recortar_bordes_negros(frame)
-        mask = segmentar_tapete_verde(frame)
-        contornos = encontrar_contornos_cartas(mask)
-
-        valor_t = palo_t = None
-
-        if contornos:
-            carta_norm = extraer_carta_normalizada(frame, contornos[0])
-            carta_orientada = orientar_carta(carta_norm)
-            valor, palo = extraer_valor_y_palo(carta_orientada)
-
-            valor_t = cv2.resize(valor, (60, 80))
-            palo_t  = cv2.resize(palo,  (60, 60))
-
+        res = extraer_plantillas(frame)
+        if res is not None:
+            carta_orientada, valor_t, palo_t, valor_g, palo_g = res
             cv2.imshow("Carta orientada", carta_orientada)
             cv2.imshow("Valor plantilla", valor_t)
             cv2.imshow("Palo plantilla", palo_t)
@@ -133,20 +263,102 @@ def main():
 
         if key == ord('q'):
             break
+        if key == ord('n'):
+            valor, palo = pedir_etiqueta(valor, palo)
+            continua = False
+        if key == ord('c'):
+            continua = not continua
+            print("Captura continua:", "ON" if continua else "OFF")
 
-        if key == ord('s') and valor_t is not None and palo_t is not None:
-            ruta_valor = f"plantillas/valor/{NOMBRE_VALOR}.png"
-            ruta_palo  = f"plantillas/palo/{NOMBRE_PALO}.png"
-            cv2.imwrite(ruta_valor, valor_t)
-            cv2.imwrite(ruta_palo, palo_t)
-            print("Plantillas guardadas en:")
-            print("  ", ruta_valor)
-            print("  ", ruta_palo)
-            break
+        capturar = key == ord('s') or (continua and n_frame % CADA_N_FRAMES == 0)
+        if capturar and res is not None:
+            if anadir_muestra(muestras, valor, palo, valor_g, palo_g):
+                print(f"  ✔ {valor} de {palo}: "
+                      f"{muestras['cartas'][(valor, palo)]}/{MUESTRAS_POR_CARTA}")
+            elif continua:
+                print("  Carta completa, captura continua OFF")
+                continua = False
 
     cap.release()
     cv2.destroyAllWindows()
 
 
+def sesion_video(muestras):
+    etiquetas = leer_etiquetas(RUTA_ETIQUETAS)
+    ya_recortado = False
+    if os.path.isdir(RUTA_VIDEO):
+        cap = ReproductorFrames(RUTA_VIDEO, velocidad="maxima")
+        ya_recortado = cap.recortado
+    else:
+        cap = cv2.VideoCapture(RUTA_VIDEO)
+    if not cap.isOpened():
+        print("No se pudo abrir el vídeo:", RUTA_VIDEO)
+        return
+
+    n_frame = -1
+    while True:
+        ok, frame = cap.read()
+        if not ok:
+            break
+        n_frame += 1
+        if n_frame % CADA_N_FRAMES != 0:
+            continue
+
+        etiqueta = etiqueta_de_frame(etiquetas, n_frame)
+        if etiqueta is None:
+            continue
+        res = extraer_plantillas(frame, ya_recortado)
+        if res is not None:
+            anadir_muestra(muestras, etiqueta[0], etiqueta[1], res[3], res[4])
+
+    cap.release()
+    print("Frames leídos del vídeo:", n_frame + 1)
+
+
+def guardar_banco(muestras):
+    """
+    Para cada clase escribe:
+      - plantillas/<tipo>/<clase>.png      (mediana de las capturas reales)
+      - plantillas/muestras/<tipo>/<clase>/ (capturas + variantes aumentadas)
+    """
+    rng = np.random.default_rng(SEMILLA)
+    for tipo in ("valor", "palo"):
+        for clase, capturas in muestras[tipo].items():
+            if not capturas:
+                continue
+
+            # Las capturas están en gris invertido: Otsu por muestra, como en
+            # step5 y como las variantes de aumentar
+            binarias = list(binarizar_otsu_lote(np.stack(capturas)))
+            mediana = np.median(np.stack(binarias), axis=0)
+            plantilla = np.where(mediana > 127, 255, 0).astype(np.uint8)
+            os.makedirs(os.path.join(PLANTILLAS_DIR, tipo), exist_ok=True)
+            imwrite_unicode(os.path.join(PLANTILLAS_DIR, tipo, f"{clase}.png"), plantilla)
+
+            # El banco de la clase se reconstruye entero
+            dir_clase = os.path.join(MUESTRAS_DIR, tipo, clase)
+            os.makedirs(dir_clase, exist_ok=True)
+            for fname in os.listdir(dir_clase):
+                if fname.endswith(".png"):
+                    os.remove(os.path.join(dir_clase, fname))
+
+            todas = binarias + aumentar(capturas, COPIAS_AUMENTO, rng)
+            for i, img in enumerate(todas):
+                imwrite_unicode(os.path.join(dir_clase, f"{i:04d}.png"), img)
+            print(f"  ✔ {tipo}/{clase}: {len(capturas)} capturas -> {len(todas)} muestras")
+
+
+def main():
+    print("Plantillas en:", PLANTILLAS_DIR)
+    muestras = nueva_muestras()
+
+    if RUTA_VIDEO is not None:
+        sesion_video(muestras)
+    else:
+        sesion_camara(muestras)
+
+    guardar_banco(muestras)
+
+
 if __name__ == "__main__":
     main()
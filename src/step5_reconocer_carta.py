@@ -1,14 +1,55 @@
 import cv2
 import numpy as np
+import json
 import os
+import time
+
+from descriptores import construir_banco_descriptores, puntuar_descriptores
+from glifos import localizar_valor_y_palo, recortar, ajustar_plantilla
+from grabacion import GrabadorFrames, ReproductorFrames
+from morfologia_paralela import segmentar_por_bandas
+from planificador import (PlanificadorCartas, ControlDegradacion, ms_desde,
+                          segmentar_reducido, reconocer_en_cascada)
 
 CAM_INDEX = 1  # índice de tu iVCam
 
+# Motor de reconocimiento: "template" (matchTemplate sobre píxeles)
+# o "descriptores" (Hu + HOG reducido, ver descriptores.py)
+MOTOR_RECONOCIMIENTO = "template"
+
+# Recortes ajustados de valor/palo por componentes conexas (glifos.py).
+# Las plantillas deben capturarse con el mismo ajuste (step4).
+LOCALIZAR_GLIFOS = True
+
+# Grabación / reproducción (grabacion.py). None = desactivado.
+GRABAR_DIR = None            # p. ej. os.path.join(ROOT_DIR, "grabaciones", "partida1")
+GRABAR_RECORTADO = True      # False: se graba el frame crudo de la cámara
+REPRODUCIR_DIR = None        # grabación a usar en lugar de la cámara
+VELOCIDAD_REPRODUCCION = "original"   # "original" o "maxima"
+
+# Umbrales por clase calculados con calibrar_umbrales.py, un fichero por
+# motor (ruta_umbrales). Sin fichero: UMBRAL_DEFECTO del motor y sin margen.
+UMBRAL_DEFECTO = {"template": 0.30, "descriptores": 0.85}
+MOSTRAR_SCORES = False  # imprime los scores de cada carta (depuración)
+
+# Hilos para segmentar el tapete por bandas (morfologia_paralela.py).
+# 1 = segmentación normal de un solo paso.
+N_HILOS_SEGMENTACION = 1
+
+# Presupuesto de tiempo por frame (planificador.py): solo se reconocen las
+# cartas nuevas / movidas / dudosas con el motor elegido; si no se llega a
+# los FPS el pipeline se degrada y pasa a la cascada (descriptores primero).
+# La etapa de descriptores solo entra con sus umbrales calibrados: con el
+# UMBRAL_DEFECTO rechazaría la mayoría de cartas y la cascada no ahorraría.
+PLANIFICAR = False
+
 SRC_DIR = os.path.dirname(__file__)
 ROOT_DIR = os.path.dirname(SRC_DIR)
 
 PLANTILLAS_VALOR_DIR = os.path.join(ROOT_DIR, "plantillas", "valor")
 PLANTILLAS_PALO_DIR  = os.path.join(ROOT_DIR, "plantillas", "palo")
+MUESTRAS_VALOR_DIR = os.path.join(ROOT_DIR, "plantillas", "muestras", "valor")
+MUESTRAS_PALO_DIR  = os.path.join(ROOT_DIR, "plantillas", "muestras", "palo")
 
 
 def imread_unicode(path, flags):
@@ -102,6 +143,11 @@ def extraer_valor_y_palo(carta_orientada):
     gray = cv2.cvtColor(corner, cv2.COLOR_BGR2GRAY)
     _, binaria = cv2.threshold(gray, 0, 255,
                                cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    if LOCALIZAR_GLIFOS:
+        cajas = localizar_valor_y_palo(binaria)
+        if cajas is not None:
+            return recortar(binaria, cajas[0]), recortar(binaria, cajas[1])
+    # Sin glifos localizados: corte fijo al 55% de la altura
     ch, cw = binaria.shape
     corte = int(ch * 0.55)
     valor = binaria[0:corte, :]
@@ -122,6 +168,9 @@ def cargar_plantillas(directorio):
             print("  ⚠ No se pudo leer:", ruta)
             continue
         clave = os.path.splitext(fname)[0]
+        if LOCALIZAR_GLIFOS:
+            # Las plantillas con el corte fijo traen margen: se ajustan al glifo
+            img = ajustar_plantilla(img)
         plantillas[clave] = img
         print("  ✔ Cargada plantilla:", clave, "->", img.shape)
     if not plantillas:
@@ -129,19 +178,147 @@ def cargar_plantillas(directorio):
     return plantillas
 
 
-def reconocer_por_template(roi, plantillas):
-    if not plantillas:
-        return "desconocido", -1.0
-    mejor_clave = "desconocido"
-    mejor_score = -1
-    for clave, templ in plantillas.items():
+def cargar_muestras(directorio):
+    """
+    Lee el banco de muestras de step4: una subcarpeta por clase.
+    Devuelve {clave: [img, ...]} (vacío si no existe).
+    """
+    muestras = {}
+    if not os.path.isdir(directorio):
+        return muestras
+    for clave in sorted(os.listdir(directorio)):
+        dir_clase = os.path.join(directorio, clave)
+        if not os.path.isdir(dir_clase):
+            continue
+        imgs = [imread_unicode(os.path.join(dir_clase, f), cv2.IMREAD_GRAYSCALE)
+                for f in sorted(os.listdir(dir_clase))]
+        imgs = [img for img in imgs if img is not None]
+        if imgs:
+            muestras[clave] = imgs
+    total = sum(len(v) for v in muestras.values())
+    print(f"Muestras en {directorio}: {total} ({len(muestras)} clases)")
+    return muestras
+
+
+def puntuar_template(roi, plantillas):
+    """Devuelve (claves, scores) con el máximo de matchTemplate por plantilla."""
+    claves = list(plantillas.keys())
+    scores = np.full(len(claves), -1.0, np.float32)
+    for i, templ in enumerate(plantillas.values()):
         roi_resized = cv2.resize(roi, (templ.shape[1], templ.shape[0]))
         res = cv2.matchTemplate(roi_resized, templ, cv2.TM_CCOEFF_NORMED)
         _, max_val, _, _ = cv2.minMaxLoc(res)
-        if max_val > mejor_score:
-            mejor_score = max_val
-            mejor_clave = clave
-    return mejor_clave, mejor_score
+        scores[i] = max_val
+    return claves, scores
+
+
+def crear_puntuador(plantillas, motor=MOTOR_RECONOCIMIENTO, muestras=None):
+    """
+    Devuelve una función roi -> (claves, scores) con el score de todas
+    las clases según el motor elegido. Con "descriptores" el banco
+    (plantillas + muestras) se precalcula aquí, una sola vez.
+    """
+    if motor == "descriptores":
+        banco = construir_banco_descriptores(plantillas, muestras)
+        return lambda roi: puntuar_descriptores(roi, banco)
+    if motor == "template":
+        return lambda roi: puntuar_template(roi, plantillas)
+    raise ValueError(f"Motor de reconocimiento desconocido: {motor}")
+
+
+def crear_reconocedor(plantillas, motor=MOTOR_RECONOCIMIENTO, muestras=None):
+    """Como crear_puntuador, pero la función devuelve (clave, score)."""
+    puntuar = crear_puntuador(plantillas, motor, muestras)
+
+    def reconocer(roi):
+        claves, scores = puntuar(roi)
+        if len(claves) == 0:
+            return "desconocido", -1.0
+        idx = int(np.argmax(scores))
+        return claves[idx], float(scores[idx])
+
+    return reconocer
+
+
+# --------- UMBRALES --------- #
+
+def ruta_umbrales(motor=MOTOR_RECONOCIMIENTO):
+    return os.path.join(ROOT_DIR, "plantillas", f"umbrales_{motor}.json")
+
+
+def umbrales_por_defecto(motor=MOTOR_RECONOCIMIENTO):
+    return {"umbral_defecto": UMBRAL_DEFECTO[motor], "umbrales": {}, "margen": 0.0}
+
+
+def cargar_umbrales(motor=MOTOR_RECONOCIMIENTO, ruta=None):
+    """
+    Lee los umbrales calibrados del motor: {"valor": {...}, "palo": {...}}.
+    Si no existen o son de otro motor, todo vuelve a UMBRAL_DEFECTO.
+    """
+    ruta = ruta or ruta_umbrales(motor)
+    defecto = {"valor": umbrales_por_defecto(motor), "palo": umbrales_por_defecto(motor)}
+    if not os.path.isfile(ruta):
+        print(f"Sin umbrales calibrados para '{motor}', se usa", UMBRAL_DEFECTO[motor])
+        return defecto
+    with open(ruta, encoding="utf-8") as f:
+        datos = json.load(f)
+    if datos.get("motor") != motor:
+        print(f"⚠ Umbrales calibrados para '{datos.get('motor')}', "
+              f"motor actual '{motor}': se usa {UMBRAL_DEFECTO[motor]}")
+        return defecto
+    print("Umbrales calibrados cargados de:", ruta)
+    return {"valor": datos["valor"], "palo": datos["palo"]}
+
+
+def decidir(claves, scores, umbrales):
+    """
+    Aplica el umbral de la clase ganadora y el margen sobre la segunda.
+    Devuelve (clave o "?", score).
+    """
+    if len(claves) == 0:
+        return "?", -1.0
+    orden = np.argsort(scores)[::-1]
+    mejor = float(scores[orden[0]])
+    segunda = float(scores[orden[1]]) if len(orden) > 1 else -1.0
+    clave = claves[orden[0]]
+
+    umbral = umbrales["umbrales"].get(clave, umbrales["umbral_defecto"])
+    if mejor < umbral or mejor - segunda < umbrales["margen"]:
+        return "?", mejor
+    return clave, mejor
+
+
+def crear_etapa(plantillas, muestras, tipo, motor):
+    """Etapa para reconocer_en_cascada: (puntuar, decidir_etapa) del motor."""
+    puntuar = crear_puntuador(plantillas, motor, muestras)
+    umbrales = cargar_umbrales(motor)[tipo]
+    return puntuar, lambda claves, scores: decidir(claves, scores, umbrales)
+
+
+def reconocer_carta(frame_rec, cnt, etapas_valor, etapas_palo, solo_primera=False):
+    """Devuelve (valor, score_val, palo, score_palo) de un contorno de carta."""
+    carta_norm = extraer_carta_normalizada(frame_rec, cnt)
+    carta_orientada = orientar_carta(carta_norm)
+    valor_roi, palo_roi = extraer_valor_y_palo(carta_orientada)
+
+    cv2.imshow("Carta orientada", carta_orientada)
+    cv2.imshow("Valor (ROI)", valor_roi)
+    cv2.imshow("Palo (ROI)", palo_roi)
+
+    valor, score_val = reconocer_en_cascada(valor_roi, etapas_valor, solo_primera)
+    palo, score_palo = reconocer_en_cascada(palo_roi, etapas_palo, solo_primera)
+
+    if MOSTRAR_SCORES:
+        print(f"Scores -> valor: {score_val:.3f}   palo: {score_palo:.3f}")
+    return valor, score_val, palo, score_palo
+
+
+def dibujar_carta(salida, rect, nombre_carta):
+    x, y, w, h = rect
+    cv2.rectangle(salida, (x, y), (x + w, y + h), (0, 0, 255), 2)
+    cv2.putText(salida, nombre_carta,
+                (x, y - 10), cv2.FONT_HERSHEY_SIMPLEX,
+                0.8, (0, 0, 255), 2, cv2.LINE_AA)
 
 
 def main():
@@ -156,55 +333,117 @@ def main():
     print("\nPlantillas de valor cargadas:", list(plantillas_valor.keys()))
     print("Plantillas de palo cargadas :", list(plantillas_palo.keys()))
 
-    cap = cv2.VideoCapture(CAM_INDEX, cv2.CAP_DSHOW)
+    print("Motor de reconocimiento:", MOTOR_RECONOCIMIENTO)
+    usar_cascada = False
+    if PLANIFICAR and MOTOR_RECONOCIMIENTO != "descriptores":
+        usar_cascada = os.path.isfile(ruta_umbrales("descriptores"))
+        if not usar_cascada:
+            print("⚠ Sin umbrales calibrados de descriptores (calibrar_umbrales.py con "
+                  "MOTOR = \"descriptores\"): los modos degradados no usan la cascada")
+
+    muestras_valor = muestras_palo = None
+    if MOTOR_RECONOCIMIENTO == "descriptores" or usar_cascada:
+        muestras_valor = cargar_muestras(MUESTRAS_VALOR_DIR)
+        muestras_palo = cargar_muestras(MUESTRAS_PALO_DIR)
+    etapas_valor = [crear_etapa(plantillas_valor, muestras_valor, "valor", MOTOR_RECONOCIMIENTO)]
+    etapas_palo = [crear_etapa(plantillas_palo, muestras_palo, "palo", MOTOR_RECONOCIMIENTO)]
+
+    # Cascada para los modos degradados: descriptores (baratos) antes del
+    # motor elegido. Si el motor ya son descriptores, o no están
+    # calibrados, es la misma etapa.
+    cascada_valor, cascada_palo = etapas_valor, etapas_palo
+    if usar_cascada:
+        cascada_valor = [crear_etapa(plantillas_valor, muestras_valor, "valor", "descriptores")] + etapas_valor
+        cascada_palo = [crear_etapa(plantillas_palo, muestras_palo, "palo", "descriptores")] + etapas_palo
+
+    planificador = PlanificadorCartas()
+    control = ControlDegradacion()
+    n_frame = -1
+
+    ya_recortado = False
+    if REPRODUCIR_DIR is not None:
+        cap = ReproductorFrames(REPRODUCIR_DIR, VELOCIDAD_REPRODUCCION)
+        ya_recortado = cap.recortado
+        print("Reproduciendo:", REPRODUCIR_DIR, f"({len(cap)} frames)")
+    else:
+        cap = cv2.VideoCapture(CAM_INDEX, cv2.CAP_DSHOW)
     if not cap.isOpened():
         print("No se pudo abrir la cámara.")
         return
 
-    while True:
-        ok, frame = cap.read()
-        if not ok:
-            break
+    grabador = None
+    if GRABAR_DIR is not None:
+        grabador = GrabadorFrames(GRABAR_DIR, recortado=GRABAR_RECORTADO or ya_recortado)
+        print("Grabando en:", GRABAR_DIR)
 
-        frame_rec = recortar_bordes_negros(frame)
-        mask = segmentar_tapete_verde(frame_rec)
-        contornos = encontrar_contornos_cartas(mask)
-
-        salida = frame_rec.copy()
-
-        for cnt in contornos:
-            carta_norm = extraer_carta_normalizada(frame_rec, cnt)
-            carta_orientada = orientar_carta(carta_norm)
-            valor_roi, palo_roi = extraer_valor_y_palo(carta_orientada)
-
-            cv2.imshow("Carta orientada", carta_orientada)
-            cv2.imshow("Valor (ROI)", valor_roi)
-            cv2.imshow("Palo (ROI)", palo_roi)
-
-            valor, score_val = reconocer_por_template(valor_roi, plantillas_valor)
-            palo, score_palo = reconocer_por_template(palo_roi, plantillas_palo)
-
-            print(f"Scores -> valor: {score_val:.3f}   palo: {score_palo:.3f}")
-
-            if score_val < 0.30:
-                valor = "?"
-            if score_palo < 0.30:
-                palo = "?"
-
-            nombre_carta = f"{valor} de {palo}"
-            x, y, w, h = cv2.boundingRect(cnt)
-            cv2.rectangle(salida, (x, y), (x + w, y + h), (0, 0, 255), 2)
-            cv2.putText(salida, nombre_carta,
-                        (x, y - 10), cv2.FONT_HERSHEY_SIMPLEX,
-                        0.8, (0, 0, 255), 2, cv2.LINE_AA)
-
-        cv2.imshow("Resultado", salida)
-
-        if cv2.waitKey(1) & 0xFF == ord('q'):
-            break
-
-    cap.release()
-    cv2.destroyAllWindows()
+    try:
+        while True:
+            ok, frame = cap.read()
+            if not ok:
+                break
+            t_frame = time.perf_counter()
+            n_frame += 1
+
+            frame_rec = frame if ya_recortado else recortar_bordes_negros(frame)
+            if grabador is not None:
+                grabador.grabar(frame_rec if GRABAR_RECORTADO else frame)
+            if PLANIFICAR and control.segmentacion_reducida:
+                contornos = segmentar_reducido(frame_rec, segmentar_tapete_verde,
+                                               encontrar_contornos_cartas)
+            else:
+                if N_HILOS_SEGMENTACION > 1:
+                    mask = segmentar_por_bandas(frame_rec, segmentar_tapete_verde, N_HILOS_SEGMENTACION)
+                else:
+                    mask = segmentar_tapete_verde(frame_rec)
+                contornos = encontrar_contornos_cartas(mask)
+
+            salida = frame_rec.copy()
+
+            if PLANIFICAR:
+                visibles = planificador.asociar(contornos, n_frame)
+                # En solo_cascada tampoco se re-verifican las confirmadas: así el
+                # modo ahorra aunque la cascada tenga una sola etapa
+                pendientes = planificador.cola(visibles, n_frame,
+                                               reverificar=not control.solo_cascada)
+                if control.cascada:
+                    etapas = (cascada_valor, cascada_palo)
+                else:
+                    etapas = (etapas_valor, etapas_palo)
+
+                # Al menos una carta por frame; el resto, mientras quede presupuesto
+                procesadas = 0
+                for pista in pendientes:
+                    if procesadas > 0 and ms_desde(t_frame) > control.presupuesto_ms():
+                        break
+                    valor, _, palo, _ = reconocer_carta(
+                        frame_rec, pista["contorno"], *etapas,
+                        solo_primera=control.solo_cascada)
+                    planificador.actualizar(pista, valor, palo, n_frame)
+                    procesadas += 1
+
+                for pista in visibles:
+                    nombre_carta = "..." if pista["valor"] is None else f"{pista['valor']} de {pista['palo']}"
+                    dibujar_carta(salida, pista["rect"], nombre_carta)
+
+                control.registrar(ms_desde(t_frame))
+                cv2.putText(salida, f"Modo: {control.modo}  cartas: {len(visibles)}  "
+                                    f"en cola: {len(pendientes) - procesadas}",
+                            (10, 25), cv2.FONT_HERSHEY_SIMPLEX,
+                            0.6, (255, 255, 255), 2, cv2.LINE_AA)
+            else:
+                for cnt in contornos:
+                    valor, _, palo, _ = reconocer_carta(frame_rec, cnt, etapas_valor, etapas_palo)
+                    dibujar_carta(salida, cv2.boundingRect(cnt), f"{valor} de {palo}")
+
+            cv2.imshow("Resultado", salida)
+
+            if cv2.waitKey(1) & 0xFF == ord('q'):
+                break
+    finally:
+        cap.release()
+        if grabador is not None:
+            grabador.cerrar()
+        cv2.destroyAllWindows()
 
 
 if __name__ == "__main__":